@@ -1,7 +1,8 @@
 import os
-import random
 import time
 
+import numpy as np
+
 from whiplash.api.client import Whiplash
 from whiplash.api.client.vector import Vector
 
@@ -15,11 +16,14 @@ whiplash = Whiplash(
 )
 
 dims = 1536
+rng = np.random.default_rng()
 
 
 def random_vector():
+    # The API client sends JSON, so the vector is converted to a list of floats
     vector = Vector(
-        f"id_{random.randint(100,99999999)}", [random.random() for _ in range(dims)]
+        f"id_{rng.integers(100, 99999999)}",
+        rng.random(dims, dtype=np.float32).tolist(),
     )
     return vector
 
@@ -1,15 +1,16 @@
 import os
-import random
 
 import numpy as np
 
 from whiplash import Vector, Whiplash
 
+rng = np.random.default_rng()
+
 
 def random_vector():
     vector = Vector(
-        f"id_{random.randint(100,99999999)}",
-        np.array([random.random() for _ in range(n_features)]),
+        f"id_{rng.integers(100, 99999999)}",
+        rng.random(n_features, dtype=np.float32),
     )
     return vector
 
@@ -1,7 +1,11 @@
 import numpy as np
+import pytest
 from moto import mock_dynamodb
 
 from whiplash import Vector
+from whiplash import collection as collection_module
+from whiplash.collection import Collection
+from whiplash.collection_config import CollectionConfig
 from whiplash.whiplash import Whiplash
 
 
@@ -111,3 +115,219 @@ def test_search_with_small_k():
 
     # Ensure the result has only one item
     assert len(result) == 1
+
+
+@mock_dynamodb
+def test_search_ranks_by_signature(monkeypatch):
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+    monkeypatch.setattr(collection_module, "RERANK_CANDIDATES", 5)
+
+    # Insert more vectors than are kept by the signature pre-ranking
+    vectors = [create_random_vector(n_features, str(i)) for i in range(30)]
+    for vector in vectors:
+        collection.insert(vector)
+
+    # The exact vector has an identical signature and must survive pre-ranking
+    result = collection.search(vectors[7].vector, k=1)
+
+    assert len(result) == 1
+    assert result[0].id == vectors[7].id
+
+
+@mock_dynamodb
+def test_search_prefetches_most_voted_candidates(monkeypatch):
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+    monkeypatch.setattr(collection_module, "PREFETCH_CANDIDATES", 1)
+    monkeypatch.setattr(collection_module, "RERANK_CANDIDATES", 1)
+
+    # Centered vectors rarely share every bucket with each other
+    rng = np.random.default_rng(7)
+    vectors = [Vector(str(i), rng.standard_normal(n_features)) for i in range(30)]
+    collection.insert_batch(vectors)
+
+    # The exact vector is in every bucket of the query and has the most votes
+    projections = collection.project(np.atleast_2d(vectors[7].vector))
+    bucket_keys = [keys[0] for keys in collection.bucket_keys(projections)]
+    votes = collection.gather_candidates(bucket_keys)
+    assert votes.most_common(1) == [(vectors[7].id, n_planes)]
+
+    result = collection.search(vectors[7].vector, k=1)
+    assert result[0].id == vectors[7].id
+
+
+@mock_dynamodb
+def test_insert_batch_empty():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    collection.insert_batch([])
+
+    assert collection.vector_table.dump() == []
+    assert collection.bucket_table.dump() == []
+
+
+@mock_dynamodb
+def test_search_recall_against_exact_scoring():
+    n_features = 32
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    # Clustered vectors put many close neighbors in the buckets of a query
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((3, n_features))
+    matrix = centers[rng.integers(0, 3, 300)] + 0.1 * rng.standard_normal(
+        (300, n_features)
+    )
+    collection.insert_batch([Vector(str(i), v) for i, v in enumerate(matrix)])
+    query = (centers[0] + 0.1 * rng.standard_normal(n_features)).astype(np.float32)
+
+    # Exact scoring of every vector in the union of the query buckets
+    projections = collection.project(np.atleast_2d(query))
+    union = set()
+    for keys in collection.bucket_keys(projections):
+        union |= (collection.bucket_table.get(keys[0]) or {}).get("ids", set())
+    union_ids = sorted(union, key=int)
+    union_matrix = matrix[[int(id) for id in union_ids]].astype(np.float32)
+    similarities = union_matrix @ query / np.linalg.norm(union_matrix, axis=1)
+    expected = {union_ids[i] for i in np.argsort(-similarities)[:5]}
+
+    assert len(union) > 20
+    result = collection.search(query, k=5, precise=True)
+    assert {x.id for x in result} == expected
+
+
+@mock_dynamodb
+def test_insert_batch_and_search():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    # Insert a batch of vectors
+    vectors = [create_random_vector(n_features, str(i)) for i in range(10)]
+    collection.insert_batch(vectors)
+
+    # Ensure every vector can be found with the bucket keys of a single insert
+    for vector in vectors:
+        result = collection.search(vector.vector, k=1)
+        assert result[0].id == vector.id
+
+
+@mock_dynamodb
+def test_search_precise_and_quantized():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    # A small component is lost by int8 quantization but not by the rescoring
+    vector = create_random_vector(n_features)
+    vector.vector[0] = 0.00087
+    collection.insert(vector)
+    query = vector.vector * 2
+
+    precise = collection.search(query, k=1, precise=True)
+    quantized = collection.search(query, k=1)
+
+    assert precise[0].id == quantized[0].id == vector.id
+    assert quantized[0].dist == pytest.approx(precise[0].dist, abs=1e-6)
+    assert np.array_equal(precise[0].vector, vector.vector)
+    assert np.array_equal(quantized[0].vector, vector.vector)
+
+
+@mock_dynamodb
+def test_get_bulk_items_with_stored_norms():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    vector = create_random_vector(n_features)
+    collection.insert(vector)
+
+    item = collection.get_bulk_items([vector.id])[0]
+    assert item.norm == pytest.approx(np.linalg.norm(vector.vector), rel=1e-5)
+    _, quantized, norms = collection.get_bulk_quantized([vector.id])
+    assert norms[0] == pytest.approx(np.linalg.norm(quantized[0].astype(float)))
+
+
+@mock_dynamodb
+def test_search_vectors_stored_without_quantization():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    # Store a vector the way it was written before int8 quantization
+    vector = create_random_vector(n_features)
+    collection.vector_table.put(vector.to_dynamo())
+    for plane_id in collection.config.uniform_planes.keys():
+        bucket_key = collection.hash_key(vector.vector, plane_id)
+        collection.bucket_table.update_column(bucket_key, "ids", vector.id)
+
+    result = collection.search(vector.vector, k=1)
+
+    assert result[0].id == vector.id
+
+
+@mock_dynamodb
+def test_bucket_keys_match_hash_key():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    # Keys from the fused projection match hashing each plane separately
+    vectors = np.random.rand(5, n_features)
+    keys = collection.bucket_keys(collection.project(vectors))
+
+    assert len(keys) == n_planes
+    for plane_id, plane_keys in enumerate(keys):
+        assert plane_keys == [collection.hash_key(v, plane_id) for v in vectors]
+
+
+@mock_dynamodb
+def test_search_collection_with_string_keys():
+    n_features = 10
+    n_planes = 3
+
+    # Collections created before binary keys keep base 36 string bucket keys
+    config = CollectionConfig(
+        "legacy_collection", "us-west-1", "dev", "whiplash", n_features, n_planes, 8, 2
+    )
+    config.create_uniform_planes()
+    collection = Collection(config)
+    collection.create()
+
+    vector = create_random_vector(n_features)
+    collection.insert(vector)
+
+    assert isinstance(collection.hash_key(vector.vector, 0), str)
+    assert collection.search(vector.vector, k=1)[0].id == vector.id
+
+
+@mock_dynamodb
+def test_group_buckets_matches_bucket_keys():
+    n_features = 10
+    n_planes = 3
+    collection = create_collection(n_features, n_planes)
+
+    vectors = np.random.rand(50, n_features)
+    ids = np.array([str(i) for i in range(len(vectors))])
+    projections = collection.project(vectors)
+
+    expected = {}
+    for keys in collection.bucket_keys(projections):
+        for id, key in zip(ids, keys):
+            expected.setdefault(key, set()).add(id)
+    buckets = collection.group_buckets(projections, ids)
+
+    assert {k: set(np.concatenate(v).tolist()) for k, v in buckets.items()} == expected
+
+
+def test_vector_is_contiguous_float32():
+    vector = Vector("test_id", [0.5, 1.5, 2.5])
+
+    assert vector.vector.dtype == np.float32
+    assert vector.vector.flags["C_CONTIGUOUS"]
+    assert Vector.from_dynamo(vector.to_dynamo()).vector.tolist() == [0.5, 1.5, 2.5]
@@ -1,13 +1,21 @@
 import numpy as np
 import pytest
 
-from whiplash.hashing import vector_plane_hash
+from whiplash import hashing
+from whiplash.hashing import (
+    group_codes,
+    projection_byte_keys,
+    projection_keys,
+    sign_kernel,
+    vector_plane_hash,
+)
 
 np.random.seed(42)
 
 
 def create_uniform_planes(size) -> np.ndarray:
-    return np.random.randn(8, size).T
+    # Seed each set of planes so expected keys do not depend on test order
+    return np.random.default_rng(42).standard_normal((8, size)).T
 
 
 def test_vector_plane_hash_with_zeros():
@@ -19,12 +27,12 @@ def test_vector_plane_hash_with_zeros():
 def test_vector_plane_hash_with_ones():
     hash_code_ones = np.ones(10, dtype=np.float64)
     key_ones = vector_plane_hash(hash_code_ones, create_uniform_planes(10))
-    assert key_ones == "48"
+    assert key_ones == "3E"
 
 
 def test_vector_plane_hash_with_different_sizes():
     hash_code_size_1 = np.array([1], dtype=np.uint8)
-    assert vector_plane_hash(hash_code_size_1, create_uniform_planes(1)) == "24"
+    assert vector_plane_hash(hash_code_size_1, create_uniform_planes(1)) == "4Y"
 
     hash_code_size_100 = np.random.rand(100).astype(np.uint8)
     assert vector_plane_hash(hash_code_size_100, create_uniform_planes(100)) == "73"
@@ -43,3 +51,70 @@ def test_vector_plane_hash_with_empty_input():
     hash_code_empty = np.array([], dtype=np.uint8)
     with pytest.raises(ValueError):
         vector_plane_hash(hash_code_empty, np.random.rand(10))
+
+
+def test_projection_keys_numpy_fallback(monkeypatch):
+    vectors = np.random.rand(20, 10)
+    planes = create_uniform_planes(10)
+    keys = projection_keys(np.dot(vectors, planes))
+
+    assert keys == [vector_plane_hash(vector, planes) for vector in vectors]
+    monkeypatch.setattr(hashing, "njit", None)
+    assert projection_keys(np.dot(vectors, planes)) == keys
+
+
+def test_projection_keys_with_wide_planes():
+    # Planes wider than a packed integer use the string based hash
+    vectors = np.random.rand(3, 10)
+    planes = np.random.default_rng(42).standard_normal((70, 10)).T
+    keys = projection_keys(np.dot(vectors, planes))
+
+    assert keys == [vector_plane_hash(vector, planes) for vector in vectors]
+    assert int(keys[0], 36) < 2**70
+
+
+def test_projection_byte_keys_are_prefixed_with_plane_id():
+    vectors = np.random.rand(5, 10)
+    projections = np.dot(vectors, create_uniform_planes(10))
+    keys = projection_byte_keys(projections, 3)
+
+    # Two bytes of plane id followed by one byte packing the 8 bits
+    assert all(len(key) == 3 and key[:2] == b"\x00\x03" for key in keys)
+    assert [np.base_repr(key[2], 36) for key in keys] == projection_keys(projections)
+    assert projection_byte_keys(projections, 4)[0][2:] == keys[0][2:]
+
+
+def test_group_codes():
+    codes = np.array([[1, 2], [2, 1], [1, 2], [1, 2]], dtype=np.uint8)
+    groups = group_codes(codes)
+
+    assert sorted(group.tolist() for group in groups) == [[0, 2, 3], [1]]
+
+
+def test_sign_kernel_matches_packbits():
+    widths = (3, 8, 13)
+    projections = np.random.rand(20, sum(widths)) - 0.5
+    bounds = np.cumsum((0,) + widths)
+    expected = np.concatenate(
+        [
+            np.packbits(projections[:, start:end] >= 0, axis=1)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ],
+        axis=1,
+    )
+
+    assert np.array_equal(sign_kernel(widths)(projections), expected)
+    assert np.array_equal(hashing._numpy_sign_kernel(widths)(projections), expected)
+    assert sign_kernel(widths) is sign_kernel(widths)
+
+
+@pytest.mark.skipif(hashing.njit is None, reason="numba is not installed")
+def test_jit_sign_kernel_is_generated_per_layout(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashing, "KERNEL_DIR", str(tmp_path))
+    widths = (5, 16)
+    projections = np.random.rand(10, sum(widths)) - 0.5
+
+    codes = hashing._jit_sign_kernel(widths)(projections)
+
+    assert len(list(tmp_path.glob("sign_kernel_*.py"))) == 1
+    assert np.array_equal(codes, hashing._numpy_sign_kernel(widths)(projections))
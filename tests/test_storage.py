@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_dynamodb
+
+from whiplash import storage
+from whiplash.storage import DynamoStorage, with_backoff
+
+
+def throttling_error():
+    return ClientError(
+        {"Error": {"Code": "ProvisionedThroughputExceededException"}}, "UpdateItem"
+    )
+
+
+def create_table():
+    table = DynamoStorage("us-west-1").get_table("test_table")
+    table.create_table()
+    return table
+
+
+def test_with_backoff_retries_throttling(monkeypatch):
+    monkeypatch.setattr(storage, "BACKOFF_SECONDS", 0)
+    calls = []
+
+    def throttled_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise throttling_error()
+        return "ok"
+
+    assert with_backoff(throttled_once) == "ok"
+    assert len(calls) == 2
+
+
+def test_with_backoff_gives_up(monkeypatch):
+    monkeypatch.setattr(storage, "BACKOFF_SECONDS", 0)
+
+    def always_throttled():
+        raise throttling_error()
+
+    with pytest.raises(ClientError):
+        with_backoff(always_throttled)
+
+
+def test_with_backoff_raises_other_errors():
+    calls = []
+
+    def fails():
+        calls.append(1)
+        raise ClientError({"Error": {"Code": "ValidationException"}}, "UpdateItem")
+
+    with pytest.raises(ClientError):
+        with_backoff(fails)
+    assert len(calls) == 1
+
+
+@mock_dynamodb
+def test_add_to_set():
+    table = create_table()
+
+    # Adding to a missing item creates it
+    table.add_to_set("bucket", "ids", {"a", "b"})
+    table.add_to_set("bucket", "ids", {"b", "c"})
+
+    item = table.get("bucket")
+    assert item is not None
+    assert item["ids"] == {"a", "b", "c"}
+
+
+@mock_dynamodb
+def test_put_batch_chunks_items():
+    table = create_table()
+    calls = []
+    batch_write_item = table.client.batch_write_item
+
+    def counted_batch_write_item(**kwargs):
+        calls.append(len(kwargs["RequestItems"]["test_table"]))
+        return batch_write_item(**kwargs)
+
+    table.client.batch_write_item = counted_batch_write_item
+    items = [{"id": str(i), "value": i} for i in range(60)]
+    table.put_batch(items, max_workers=4)
+
+    assert sorted(calls) == [10, 25, 25]
+    assert len(table.get_bulk([item["id"] for item in items])) == 60
+
+
+@mock_dynamodb
+def test_put_batch_retries_unprocessed_items(monkeypatch):
+    monkeypatch.setattr(storage, "BACKOFF_SECONDS", 0)
+    table = create_table()
+    batch_write_item = table.client.batch_write_item
+
+    def unprocessed_once(**kwargs):
+        # Report the last item as unprocessed on the first request
+        table.client.batch_write_item = batch_write_item
+        requests = kwargs["RequestItems"]["test_table"]
+        batch_write_item(RequestItems={"test_table": requests[:-1]})
+        return {"UnprocessedItems": {"test_table": requests[-1:]}}
+
+    table.client.batch_write_item = unprocessed_once
+    table.put_batch([{"id": "a"}, {"id": "b"}])
+
+    assert table.get("a") is not None
+    assert table.get("b") is not None
+
+
+@mock_dynamodb
+def test_get_bulk_chunks_items_concurrently():
+    table = create_table()
+    items = [{"id": str(i), "value": i} for i in range(250)]
+    table.put_batch(items)
+    calls = []
+    # Every chunk waits for the others, so this only passes if they overlap
+    barrier = threading.Barrier(3, timeout=5)
+    batch_get_item = table.client.batch_get_item
+
+    def concurrent_batch_get_item(**kwargs):
+        calls.append(len(kwargs["RequestItems"]["test_table"]["Keys"]))
+        barrier.wait()
+        return batch_get_item(**kwargs)
+
+    table.client.batch_get_item = concurrent_batch_get_item
+    found = table.get_bulk([item["id"] for item in items], max_workers=4)
+
+    assert sorted(calls) == [50, 100, 100]
+    assert len(found) == 250
+
+
+@mock_dynamodb
+def test_get_batch_retries_unprocessed_keys(monkeypatch):
+    monkeypatch.setattr(storage, "BACKOFF_SECONDS", 0)
+    table = create_table()
+    table.put_batch([{"id": "a"}, {"id": "b"}])
+    batch_get_item = table.client.batch_get_item
+
+    def unprocessed_once(**kwargs):
+        # Report the last key as unprocessed on the first request
+        table.client.batch_get_item = batch_get_item
+        request = kwargs["RequestItems"]["test_table"]
+        response = batch_get_item(
+            RequestItems={"test_table": {"Keys": request["Keys"][:-1]}}
+        )
+        response["UnprocessedKeys"] = {"test_table": {"Keys": request["Keys"][-1:]}}
+        return response
+
+    table.client.batch_get_item = unprocessed_once
+    found = table.get_batch(["a", "b"])
+
+    assert sorted(item["id"] for item in found) == ["a", "b"]
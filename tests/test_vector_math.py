@@ -1,6 +1,14 @@
 import numpy as np
 import pytest
-from whiplash.vector_math import cosine_similarity, cosine_similarity_bulk
+
+from whiplash import vector_math
+from whiplash.vector_math import (
+    cosine_similarity,
+    cosine_similarity_bulk,
+    hamming_distance_bulk,
+    quantize,
+    vector_norm,
+)
 
 
 def test_cosine_similarity_bulk():
@@ -8,10 +16,55 @@ def test_cosine_similarity_bulk():
     vector1 = np.array([1.0, 2.0, 3.0])
     vector2 = np.array([4.0, 5.0, 6.0])
     vectors_list = [np.array([7.0, 8.0, 9.0]), np.array([10.0, 11.0, 12.0])]
-    result = cosine_similarity_bulk(vector1, vectors_list, k=1)
+    indices, similarities = cosine_similarity_bulk(vector1, vectors_list, k=1)
 
     # Ensure the result has only one closest index
-    assert len(result) == 1
+    assert len(indices) == 1
+    assert len(similarities) == 1
+
+
+def test_cosine_similarity_bulk_ranking():
+    # Test that the most similar vectors are returned with their similarities
+    query = np.array([1.0, 0.0, 0.0])
+    vectors_list = [
+        np.array([0.0, 1.0, 0.0]),
+        np.array([1.0, 0.1, 0.0]),
+        np.array([-1.0, 0.0, 0.0]),
+        np.array([2.0, 0.0, 0.0]),
+    ]
+    indices, similarities = cosine_similarity_bulk(query, vectors_list, k=2)
+
+    assert set(indices) == {1, 3}
+    for i, similarity in zip(indices, similarities):
+        assert similarity == pytest.approx(
+            cosine_similarity(query, vectors_list[i]), abs=1e-6
+        )
+
+
+def test_cosine_similarity_bulk_k_larger_than_list():
+    # Test that k is capped by the number of vectors
+    query = np.array([1.0, 2.0, 3.0])
+    vectors_list = [np.array([7.0, 8.0, 9.0]), np.zeros(3)]
+    indices, similarities = cosine_similarity_bulk(query, vectors_list, k=5)
+
+    assert len(indices) == 2
+    assert similarities[list(indices).index(1)] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_cosine_similarity_bulk_numpy_fallback(monkeypatch):
+    # Test that the numpy path matches the optional simsimd backend
+    query = np.random.rand(16)
+    vectors_list = [np.random.rand(16) for _ in range(10)] + [np.zeros(16)]
+    indices, similarities = cosine_similarity_bulk(query, vectors_list, k=11)
+
+    monkeypatch.setattr(vector_math, "simsimd", None)
+    fallback_indices, fallback_similarities = cosine_similarity_bulk(
+        query, vectors_list, k=11
+    )
+
+    expected = dict(zip(indices, similarities))
+    for i, similarity in zip(fallback_indices, fallback_similarities):
+        assert similarity == pytest.approx(expected[i], abs=1e-5)
 
 
 def test_cosine_similarity_orthogonal():
@@ -20,10 +73,10 @@ def test_cosine_similarity_orthogonal():
     vec2 = np.array([0.0, 1.0, 0.0])
     similarity = cosine_similarity(vec1, vec2)
 
-    similarity_list = cosine_similarity_bulk(vec1, [vec2], k=1)
+    _, similarity_list = cosine_similarity_bulk(vec1, [vec2], k=1)
 
     # Ensure the similarity is 0 (orthogonal vectors)
-    assert similarity_list[0] == similarity
+    assert similarity_list[0] == pytest.approx(similarity, abs=1e-6)
     assert similarity == pytest.approx(0.0, abs=1e-6)
 
 
@@ -61,3 +114,66 @@ def test_cosine_similarity_with_zero_norm():
 
     # Ensure the similarity is 1 (two zero vectors)
     assert similarity == pytest.approx(1.0, abs=1e-6)
+
+
+def test_hamming_distance_bulk():
+    signature = bytes([0b10101010, 0b11110000])
+    signatures = [
+        bytes([0b10101010, 0b11110000]),
+        bytes([0b10101011, 0b11110000]),
+        bytes([0b01010101, 0b00001111]),
+    ]
+    distances = hamming_distance_bulk(signature, signatures)
+
+    assert list(distances) == [0, 1, 16]
+
+
+def test_quantize():
+    vector = np.array([0.5, -1.0, 0.25, 0.0])
+    quantized, scale = quantize(vector)
+
+    assert quantized.dtype == np.int8
+    assert list(quantized) == [64, -127, 32, 0]
+    assert quantized * scale == pytest.approx(vector, abs=scale)
+
+    # Zero vectors quantize to zeros with a unit scale
+    quantized, scale = quantize(np.zeros(3))
+    assert list(quantized) == [0, 0, 0]
+    assert scale == 1.0
+
+
+def test_cosine_similarity_bulk_int8():
+    # Test that int8 quantized vectors rank close to their float similarities
+    query = np.random.rand(64) - 0.5
+    vectors_list = [np.random.rand(64) - 0.5 for _ in range(10)]
+    indices, quantized_similarities = cosine_similarity_bulk(
+        quantize(query)[0], np.stack([quantize(v)[0] for v in vectors_list]), k=10
+    )
+
+    expected = dict(zip(*cosine_similarity_bulk(query, vectors_list, k=10)))
+    for i, similarity in zip(indices, quantized_similarities):
+        assert similarity == pytest.approx(expected[i], abs=0.02)
+
+
+@pytest.mark.parametrize("backend", ["simsimd", "numpy"])
+def test_cosine_similarity_bulk_with_norms(monkeypatch, backend):
+    # Test that stored norms give the same similarities as computing them
+    if backend == "numpy":
+        monkeypatch.setattr(vector_math, "simsimd", None)
+    query = np.random.rand(16)
+    vectors_list = [np.random.rand(16) for _ in range(10)] + [np.zeros(16)]
+    norms = [vector_norm(v) for v in vectors_list]
+    indices, similarities = cosine_similarity_bulk(query, vectors_list, k=11)
+    norm_indices, norm_similarities = cosine_similarity_bulk(
+        query, vectors_list, k=11, norms=norms
+    )
+
+    expected = dict(zip(indices, similarities))
+    for i, similarity in zip(norm_indices, norm_similarities):
+        assert similarity == pytest.approx(expected[i], abs=1e-5)
+
+
+def test_vector_norm_int8():
+    # Test that int8 vectors are accumulated without overflow
+    vector = np.full(64, 127, dtype=np.int8)
+    assert vector_norm(vector) == pytest.approx(127 * 8)
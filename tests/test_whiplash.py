@@ -42,6 +42,7 @@ class TestWhiplash(unittest.TestCase):
         self.assertEqual(loaded_collection.config.n_planes, n_planes)
         self.assertEqual(loaded_collection.config.bit_start, bit_start)
         self.assertEqual(loaded_collection.config.bit_scale_factor, bit_scale_factor)
+        self.assertTrue(loaded_collection.config.binary_keys)
 
     @mock_dynamodb
     def test_get_collection(self):
@@ -2,8 +2,6 @@ import os
 from typing import Optional
 from venv import logger
 
-import numpy as np
-
 from whiplash.collection import Collection
 from whiplash.responses import error_response, parse_body, response
 from whiplash.vector import Vector
@@ -61,7 +59,6 @@ def search(event, context) -> dict:
             "'query' is required and must be a n_features length list of floats"
         )
 
-    query = np.array(query, dtype=np.float32)
     limit = int(limit)
 
     results = collection.search_with_metadata(query, k=limit)
@@ -115,6 +112,6 @@ def create_batch(event, context) -> dict:
                 "'vector' required and must match 'n_features' in size"
             )
 
-        collection.insert(Vector(vector_id, np.array(vec, dtype=np.float32)))
+        collection.insert(Vector(vector_id, vec))
 
     return response({"message": "success"})
@@ -1,23 +1,52 @@
 import logging
 import os
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from operator import attrgetter
 from typing import Optional
 
 import numpy as np
-from xxhash import xxh64
 
 from whiplash.collection_config import CollectionConfig
-from whiplash.hashing import vector_plane_hash
+from whiplash.hashing import (
+    code_keys,
+    group_codes,
+    projection_byte_keys,
+    projection_keys,
+    projection_signatures,
+    vector_plane_hash,
+)
 from whiplash.storage import DynamoStorage
 from whiplash.vector import CompVector, Vector
-from whiplash.vector_math import cosine_similarity, cosine_similarity_bulk
+from whiplash.vector_math import (
+    cosine_similarity_bulk,
+    hamming_distance_bulk,
+    quantize,
+)
 
 MAX_ITEMS_PER_BUCKET = int(os.environ.get("MAX_ITEMS_PER_BUCKET", 10000))
+# Number of candidates above which search pre-ranks them by signature, and the
+# number of candidates the pre-ranking keeps
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 1000))
+# Number of most voted candidates whose signatures are fetched for pre-ranking.
+# A projected read still consumes read capacity for the full item, so pre-ranking
+# saves bandwidth but costs up to PREFETCH_CANDIDATES more item reads per search.
+PREFETCH_CANDIDATES = int(os.environ.get("PREFETCH_CANDIDATES", 4000))
+# Number of concurrent DynamoDB requests issued by a single operation
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", 16))
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def stored_norms(norms: list) -> Optional[np.ndarray]:
+    """Stack the stored norms of candidates, unless any was stored without a norm"""
+    if any(norm is None for norm in norms):
+        return None
+    return np.array(norms, dtype=np.float32)
+
+
 class Collection:
     """A collection of vectors with LSH indexing and retrieval"""
 
@@ -41,19 +70,71 @@ class Collection:
     def from_dict(data: dict):
         return Collection(CollectionConfig.from_dict(data))
 
-    def hash_key(self, vector: np.ndarray, plane_id: int) -> str:
+    def hash_key(self, vector: np.ndarray, plane_id: int) -> str | bytes:
         """Compute the hash code for a vector and plane"""
         if not self.config.uniform_planes:
             raise ValueError("Uniform planes must be created before hashing")
         if plane_id not in self.config.uniform_planes:
             raise ValueError(f"Uniform plane with id not found: {plane_id}")
         # Project the vector onto all random hyperplanes
-        return vector_plane_hash(vector, self.config.uniform_planes[plane_id])
+        plane = self.config.uniform_planes[plane_id]
+        if self.config.binary_keys:
+            projections = np.dot(np.atleast_2d(vector), plane)
+            return projection_byte_keys(projections, plane_id)[0]
+        return vector_plane_hash(vector, plane)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """Project a matrix of vectors onto all uniform planes with a single GEMM"""
+        return np.dot(vectors, self.config.stacked_planes)
+
+    def plane_codes(self, projections: np.ndarray) -> list[np.ndarray]:
+        """Pack the signs of projections into the byte codes of each plane"""
+        codes = self.config.sign_kernel(projections)
+        return [codes[:, s] for s in self.config.code_slices]
+
+    def bucket_keys(self, projections: np.ndarray) -> list[list[str | bytes]]:
+        """Compute the bucket keys of each plane for every row of projections"""
+        if not self.config.binary_keys:
+            return [
+                projection_keys(projections[:, s]) for s in self.config.plane_slices
+            ]
+        return [
+            code_keys(codes, plane_id)
+            for plane_id, codes in zip(
+                self.config.uniform_planes, self.plane_codes(projections)
+            )
+        ]
+
+    def group_buckets(
+        self, projections: np.ndarray, ids: np.ndarray
+    ) -> dict[str | bytes, list[np.ndarray]]:
+        """Group ids by bucket key, hashing one representative row per bucket"""
+        buckets: dict[str | bytes, list[np.ndarray]] = {}
+        planes = zip(
+            self.config.uniform_planes,
+            self.config.plane_slices,
+            self.plane_codes(projections),
+        )
+        for plane_id, s, codes in planes:
+            groups = group_codes(codes)
+            representatives = [group[0] for group in groups]
+            if self.config.binary_keys:
+                keys = code_keys(codes[representatives], plane_id)
+            else:
+                keys = projection_keys(projections[representatives, s])
+            for key, group in zip(keys, groups):
+                # String keys of different planes can collide, their ids are merged
+                buckets.setdefault(key, []).append(ids[group])
+        return buckets
+
+    def vector_item(self, vector: Vector, signature: bytes) -> dict:
+        """Serialize a vector with its signature and int8 quantization for storage"""
+        return {**vector.to_dynamo(signature), **vector.to_dynamo_i8()}
 
     def create(self):
         """Create the collection"""
         self.vector_table.create_table()
-        self.bucket_table.create_table()
+        self.bucket_table.create_table("B" if self.config.binary_keys else "S")
 
     def get_item(self, id: str) -> Vector:
         """Get a single vector by id"""
@@ -64,87 +145,170 @@ class Collection:
 
     def get_bulk_items(self, ids: list[str]) -> list[Vector]:
         """Get a list of vectors by id"""
-        data = self.vector_table.get_bulk(ids)
+        data = self.vector_table.get_bulk(ids, max_workers=MAX_WORKERS)
         return [Vector.from_dynamo(item) for item in data]
 
+    def get_bulk_quantized(
+        self, ids: list[str]
+    ) -> tuple[list[str], np.ndarray, Optional[np.ndarray]]:
+        """Get int8 quantized vectors by id as ids, an int8 matrix and row norms"""
+        data = self.vector_table.get_bulk(
+            ids, ["id", "vector_i8", "norm_i8"], max_workers=MAX_WORKERS
+        )
+        rows = [
+            (
+                item["id"],
+                np.frombuffer(item["vector_i8"], dtype=np.int8),
+                item.get("norm_i8"),
+            )
+            for item in data
+            if "vector_i8" in item
+        ]
+        # Vectors stored before quantization was added are quantized on read
+        legacy_ids = [item["id"] for item in data if "vector_i8" not in item]
+        rows += [
+            (x.id, quantize(x.vector)[0], None) for x in self.get_bulk_items(legacy_ids)
+        ]
+        if not rows:
+            return [], np.empty((0, self.config.n_features), dtype=np.int8), None
+
+        quantized_ids, vectors, norms = zip(*rows)
+        return list(quantized_ids), np.stack(vectors), stored_norms(norms)
+
     def insert(self, vector: Vector) -> None:
         """Insert a vector into the collection"""
         if not self.config.uniform_planes:
             raise ValueError("Uniform planes must be created before inserting")
 
-        self.vector_table.put(vector.to_dynamo())
-        for plane_id in self.config.uniform_planes.keys():
-            bucket_key = self.hash_key(vector.vector, plane_id)
-            self.bucket_table.update_column(bucket_key, "ids", vector.id)
+        projections = self.project(np.atleast_2d(vector.vector))
+        signature = projection_signatures(projections)[0]
+        self.vector_table.put(self.vector_item(vector, signature))
+        for keys in self.bucket_keys(projections):
+            self.bucket_table.update_column(keys[0], "ids", vector.id)
 
     def insert_batch(
         self, vectors: list[Vector], metadata=Optional[list[dict]]
     ) -> None:
         if not self.config.uniform_planes:
             raise ValueError("Uniform planes must be created before inserting")
+        if not vectors:
+            return
 
-        print("inserting vectors into the database")
-        self.vector_table.put_batch([x.to_dynamo() for x in vectors])
-
-        buckets = defaultdict(set)
-        for vec in vectors:
-            for plane_id in self.config.uniform_planes.keys():
-                bucket_key = self.hash_key(vec.vector, plane_id)
-                buckets[bucket_key].add(vec.id)
+        matrix = np.stack([vec.vector for vec in vectors])
+        projections = self.project(matrix)
+        signatures = projection_signatures(projections)
 
-        print(f"number of buckets {len(buckets.keys())}")
-        print(
-            sorted([(len(v), k) for k, v in dict(buckets).items()], reverse=True)[:100]
+        logger.debug("vectors=%d", len(vectors))
+        self.vector_table.put_batch(
+            [self.vector_item(x, sig) for x, sig in zip(vectors, signatures)],
+            max_workers=MAX_WORKERS,
         )
 
-        for idx, (bucket, ids) in enumerate(dict(buckets).items()):
-            print(f"update bucket {idx} / {len(buckets.keys())}")
-            self.bucket_table.table.update_item(
-                Key={"id": bucket},
-                UpdateExpression=f"ADD ids :val",
-                ExpressionAttributeValues={":val": ids},
+        buckets = self.group_buckets(projections, np.array([x.id for x in vectors]))
+        logger.debug("buckets=%d", len(buckets))
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Consume the results so that failed updates are raised
+            list(
+                executor.map(
+                    self.bucket_table.add_to_set,
+                    buckets.keys(),
+                    repeat("ids"),
+                    (set(np.concatenate(ids).tolist()) for ids in buckets.values()),
+                )
             )
 
     def insert_metadata(self, metadata: dict[str, dict]) -> None:
         items = [{**v, "id": f"meta#{k}"} for k, v in metadata.items()]
-        self.vector_table.put_batch(items)
+        self.vector_table.put_batch(items, max_workers=MAX_WORKERS)
 
-    def search(self, query: np.ndarray, k: int = 5) -> list[CompVector]:
-        """Search for the k closest vectors to the query vector"""
+    def search(
+        self, query: np.ndarray, k: int = 5, precise: bool = False
+    ) -> list[CompVector]:
+        """
+        Search for the k closest vectors to the query vector.
+        Candidates are selected on their int8 quantization and the k winners are
+        scored on their float32 vectors, unless precise is set, in which case every
+        candidate is scored on its float32 vector.
+        """
         if not self.config.uniform_planes:
             raise ValueError("Uniform planes must be created before searching")
 
-        candidate_ids = set()
-        bucket_keys = [
-            self.hash_key(query, plane_id)
-            for plane_id in self.config.uniform_planes.keys()
-        ]
+        query = np.ascontiguousarray(query, dtype=np.float32)
+        # One product yields the bucket keys of every plane and the signature
+        projections = self.project(np.atleast_2d(query))
+        bucket_keys = [keys[0] for keys in self.bucket_keys(projections)]
+        query_signature = projection_signatures(projections)[0]
 
-        buckets = self.bucket_table.get_batch(bucket_keys)
-        # Merge all the buckets "ids" lists
-        candidate_ids = {cid for bucket in buckets for cid in bucket.get("ids", set())}
-        lookup_items = self.get_bulk_items(list(candidate_ids))
-        logger.debug("Compared against N vectors:", len(lookup_items))
+        votes = self.gather_candidates(bucket_keys)
+        candidate_ids = list(votes)
+        # The pre-ranking trades recall for bandwidth on large unions only
+        if len(candidate_ids) > RERANK_CANDIDATES:
+            # Candidates sharing the most buckets with the query are the closest
+            prefetch_ids = [id for id, _ in votes.most_common(PREFETCH_CANDIDATES)]
+            signed_items = self.vector_table.get_bulk(
+                prefetch_ids, ["id", "sig"], max_workers=MAX_WORKERS
+            )
+            candidate_ids = self.closest_by_signature(
+                query_signature, signed_items, RERANK_CANDIDATES
+            )
+        if precise:
+            lookup_items = self.get_bulk_items(candidate_ids)
+        else:
+            ids, quantized, norms = self.get_bulk_quantized(candidate_ids)
+            if len(ids) == 0:
+                return []
+            closest_indices, _ = cosine_similarity_bulk(
+                quantize(query)[0], quantized, k, norms
+            )
+            # Only the k winners are fetched in float32 and scored exactly
+            lookup_items = self.get_bulk_items([ids[i] for i in closest_indices])
+        logger.debug("Compared against %d vectors", len(candidate_ids))
         if len(lookup_items) == 0:
             return []
 
-        closest_indices = cosine_similarity_bulk(
-            query, [item.vector for item in lookup_items], k
-        )
+        ids = [item.id for item in lookup_items]
+        vectors = [item.vector for item in lookup_items]
+        norms = stored_norms([item.norm for item in lookup_items])
+        closest_indices, similarities = cosine_similarity_bulk(query, vectors, k, norms)
 
         candidates = [
             CompVector(
-                id=lookup_items[i].id,
-                vector=lookup_items[i].vector,
-                dist=cosine_similarity(query, lookup_items[i].vector),
+                id=ids[i],
+                vector=vectors[i],
+                dist=float(similarity),
             )
-            for i in closest_indices
+            for i, similarity in zip(closest_indices, similarities)
         ]
-        candidates.sort(key=lambda x: x.dist, reverse=True)
+        # Only the k selected candidates are sorted, the partition is unordered
+        candidates.sort(key=attrgetter("dist"), reverse=True)
         return candidates
 
-    def search_with_metadata(self, query: np.ndarray, k: int = 5) -> list[dict]:
-        found = self.search(query, k)
+    def gather_candidates(self, bucket_keys: list[str | bytes]) -> Counter[str]:
+        """Fetch buckets in one batch, counting the buckets each candidate is in"""
+        votes: Counter[str] = Counter()
+        for bucket in self.bucket_table.get_batch(bucket_keys):
+            votes.update(bucket.get("ids", ()))
+        return votes
+
+    def closest_by_signature(
+        self, signature: bytes, items: list[dict], n: int
+    ) -> list[str]:
+        """Pre-rank vectors by the hamming distance of their signatures to the query"""
+        signed = [item for item in items if "sig" in item]
+        # Vectors stored without a signature are always kept for exact ranking
+        closest_ids = [item["id"] for item in items if "sig" not in item]
+        if len(signed) <= n:
+            return closest_ids + [item["id"] for item in signed]
+
+        distances = hamming_distance_bulk(signature, [item["sig"] for item in signed])
+        closest_indices = np.argpartition(distances, n - 1)[:n]
+        return closest_ids + [signed[i]["id"] for i in closest_indices]
+
+    def search_with_metadata(
+        self, query: np.ndarray, k: int = 5, precise: bool = False
+    ) -> list[dict]:
+        found = self.search(query, k, precise)
         ids = [f"meta#{x.id}" for x in found]
 
         metadata = self.vector_table.get_bulk(ids)
@@ -1,8 +1,11 @@
 from dataclasses import dataclass
 from decimal import Decimal
+from functools import cached_property
 
 import numpy as np
 
+from whiplash.hashing import sign_kernel
+
 
 def plane_to_bit_count(bit_start: int, bit_scale_factor: float, plane_id: int) -> int:
     """Compute the number of bits for a given plane"""
@@ -22,6 +25,8 @@ class CollectionConfig:
     bit_start: int
     bit_scale_factor: float
     uniform_planes: (dict[int, np.ndarray] | None) = None
+    # Collections created before binary keys use base 36 string bucket keys
+    binary_keys: bool = False
 
     @property
     def id(self) -> str:
@@ -30,6 +35,35 @@ class CollectionConfig:
     def __repr__(self) -> str:
         return f"CollectionConfig(n_features={self.n_features}, n_planes={self.n_planes}, bit_start={self.bit_start}, bit_scale_factor={self.bit_scale_factor})"
 
+    @cached_property
+    def stacked_planes(self) -> np.ndarray:
+        """Concatenate all uniform planes to project onto every plane at once"""
+        if not self.uniform_planes:
+            raise ValueError("Uniform planes must be created before stacking")
+        return np.ascontiguousarray(
+            np.concatenate(list(self.uniform_planes.values()), axis=1)
+        )
+
+    @cached_property
+    def plane_slices(self) -> list[slice]:
+        """Column range of each uniform plane within the stacked planes"""
+        if not self.uniform_planes:
+            raise ValueError("Uniform planes must be created before stacking")
+        bounds = np.cumsum([0] + [p.shape[1] for p in self.uniform_planes.values()])
+        return [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @cached_property
+    def code_slices(self) -> list[slice]:
+        """Byte range of each uniform plane within the packed sign codes"""
+        widths = [(s.stop - s.start + 7) // 8 for s in self.plane_slices]
+        bounds = np.cumsum([0] + widths)
+        return [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @cached_property
+    def sign_kernel(self):
+        """Sign packing kernel for the widths of the uniform planes"""
+        return sign_kernel(tuple(s.stop - s.start for s in self.plane_slices))
+
     def create_uniform_planes(self):
         """Create a set of random hyperplanes"""
         if self.uniform_planes:
@@ -52,6 +86,7 @@ class CollectionConfig:
             "n_planes": self.n_planes,
             "bit_start": self.bit_start,
             "bit_scale_factor": self.bit_scale_factor,
+            "binary_keys": self.binary_keys,
         }
 
     def to_dynamo(self):
@@ -69,6 +104,7 @@ class CollectionConfig:
             "n_planes": self.n_planes,
             "bit_start": self.bit_start,
             "bit_scale_factor": Decimal(self.bit_scale_factor),
+            "binary_keys": self.binary_keys,
             "uniform_planes": {
                 str(plane_id): plane.tobytes()
                 for plane_id, plane in self.uniform_planes.items()
@@ -101,4 +137,5 @@ class CollectionConfig:
             }
             if "uniform_planes" in config
             else None,
+            bool(config.get("binary_keys", False)),
         )
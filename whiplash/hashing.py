@@ -1,15 +1,181 @@
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+from functools import lru_cache
+from typing import Callable
+
 import numpy as np
 
+try:
+    from numba import njit  # type: ignore
+except ImportError:
+    # Optional JIT backend, fall back to numpy when it is not installed
+    njit = None
 
-def vector_plane_hash(vector: np.ndarray, uniform_plane: np.ndarray) -> str:
-    if vector is None or uniform_plane is None:
-        raise TypeError("Input vector or uniform plane is None")
+# Hash codes up to this many bits are packed into a single unsigned integer
+MAX_PACKED_BITS = 64
+# Sign kernels generated for each plane layout are written here, numba caches
+# their compiled code next to them so it survives across processes
+KERNEL_DIR = os.environ.get(
+    "KERNEL_DIR", os.path.join(tempfile.gettempdir(), "whiplash_kernels")
+)
+
+
+def _numpy_pack_signs(projections: np.ndarray) -> np.ndarray:
+    """Pack the signs of each row of projections into an integer"""
+    shifts = np.arange(projections.shape[1] - 1, -1, -1, dtype=np.uint64)
+    bits = (projections >= 0).astype(np.uint64)
+    return np.bitwise_or.reduce(bits << shifts, axis=1)
+
+
+def _jit_pack_signs(projections):
+    n_vectors, n_bits = projections.shape
+    codes = np.empty(n_vectors, dtype=np.uint64)
+    for n in range(n_vectors):
+        code = np.uint64(0)
+        for j in range(n_bits):
+            code = (code << np.uint64(1)) | np.uint64(projections[n, j] >= 0)
+        codes[n] = code
+    return codes
+
+
+if njit is not None:
+    _jit_pack_signs = njit(cache=True)(_jit_pack_signs)
+
+
+def pack_signs(projections: np.ndarray) -> np.ndarray:
+    """Pack the signs of each row of projections onto a plane into an integer"""
+    if njit is not None:
+        return _jit_pack_signs(projections)
+    return _numpy_pack_signs(projections)
+
+
+def _numpy_sign_kernel(plane_widths: tuple[int, ...]) -> Callable:
+    bounds = np.cumsum((0,) + plane_widths)
+
+    def kernel(projections: np.ndarray) -> np.ndarray:
+        return np.concatenate(
+            [
+                np.packbits(projections[:, start:end] >= 0, axis=1)
+                for start, end in zip(bounds[:-1], bounds[1:])
+            ],
+            axis=1,
+        )
+
+    return kernel
+
+
+def _kernel_source(plane_widths: tuple[int, ...]) -> str:
+    # Every column, shift and byte index is a literal, so the loops are unrolled
+    n_bytes = sum((width + 7) // 8 for width in plane_widths)
+    lines = [
+        "import numpy as np",
+        "from numba import njit",
+        "",
+        "",
+        "@njit(cache=True, boundscheck=False)",
+        "def kernel(projections):",
+        f"    codes = np.empty((projections.shape[0], {n_bytes}), dtype=np.uint8)",
+        "    for n in range(projections.shape[0]):",
+        "        row = projections[n]",
+    ]
+    column = byte = 0
+    for width in plane_widths:
+        for start in range(0, width, 8):
+            bits = [
+                f"(np.uint8(row[{column + start + i}] >= 0) << {7 - i})"
+                for i in range(min(8, width - start))
+            ]
+            lines.append(f"        codes[n, {byte}] = " + " | ".join(bits))
+            byte += 1
+        column += width
+    lines.append("    return codes")
+    return "\n".join(lines) + "\n"
+
+
+def _jit_sign_kernel(plane_widths: tuple[int, ...]) -> Callable:
+    # The kernel is generated as a module on disk, since numba only caches
+    # functions that are defined in a source file
+    digest = hashlib.sha1(repr(plane_widths).encode()).hexdigest()[:16]
+    name = f"sign_kernel_{digest}"
+    path = os.path.join(KERNEL_DIR, f"{name}.py")
+    if not os.path.exists(path):
+        os.makedirs(KERNEL_DIR, exist_ok=True)
+        # Replace atomically so concurrent processes never import a partial file
+        partial_path = f"{path}.{os.getpid()}"
+        with open(partial_path, "w") as f:
+            f.write(_kernel_source(plane_widths))
+        os.replace(partial_path, path)
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Numba resolves the globals of a cached kernel by importing its module
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module.kernel
 
-    projections: np.ndarray = np.dot(vector, uniform_plane)
+
+@lru_cache(maxsize=None)
+def sign_kernel(plane_widths: tuple[int, ...]) -> Callable:
+    """Build a kernel packing the signs of projections onto planes of fixed widths"""
+    # Each plane starts on a byte boundary, matching np.packbits of its columns
+    if njit is not None:
+        return _jit_sign_kernel(plane_widths)
+    return _numpy_sign_kernel(plane_widths)
+
+
+def _string_hash(projections: np.ndarray) -> str:
     # Compute the hash code as 0 or 1 based on the sign of the projection
     hash_code: str = "".join((projections >= 0).astype(int).astype(str))
+    # Change the base of the hash code from 2 to 36
+    return np.base_repr(int(hash_code, 2), 36)
+
+
+def projection_keys(projections: np.ndarray) -> list[str]:
+    """Compute the hash key of each row of projections onto a plane"""
+    if projections.shape[1] > MAX_PACKED_BITS:
+        return [_string_hash(row) for row in projections]
+    return [np.base_repr(int(code), 36) for code in pack_signs(projections)]
+
+
+def code_keys(codes: np.ndarray, plane_id: int) -> list[bytes]:
+    """Compute the binary hash key of each row of packed sign codes of a plane"""
+    # Prefix the plane id so that equal codes of different planes do not collide
+    prefix = plane_id.to_bytes(2, "big")
+    return [prefix + row.tobytes() for row in codes]
+
+
+def projection_byte_keys(projections: np.ndarray, plane_id: int) -> list[bytes]:
+    """Compute the binary hash key of each row of projections onto a plane"""
+    return code_keys(np.packbits(projections >= 0, axis=1), plane_id)
 
-    if len(hash_code) == 0:
+
+def projection_signatures(projections: np.ndarray) -> list[bytes]:
+    """Pack the signs of each row of projections onto all planes into bytes"""
+    return [row.tobytes() for row in np.packbits(projections >= 0, axis=1)]
+
+
+def group_codes(codes: np.ndarray) -> list[np.ndarray]:
+    """Group the indices of the equal rows of packed sign codes"""
+    # View each packed row as a single opaque value so rows sort as a whole
+    codes = np.ascontiguousarray(codes)
+    rows = codes.view(np.dtype((np.void, codes.shape[1])))[:, 0]
+    order = np.argsort(rows, kind="stable")
+    _, starts = np.unique(rows[order], return_index=True)
+    return np.split(order, starts[1:])
+
+
+def _validate(vectors: np.ndarray, uniform_plane: np.ndarray) -> None:
+    if vectors is None or uniform_plane is None:
+        raise TypeError("Input vector or uniform plane is None")
+    if uniform_plane.ndim != 2 or np.shape(vectors)[-1] != uniform_plane.shape[0]:
+        raise ValueError("Input vector and uniform plane dimensions do not match")
+    if uniform_plane.shape[1] == 0:
         raise ValueError("Hash key generated is empty")
-    # Change the base of the hash code from 2 to 58
-    return np.base_repr(int(hash_code, 2), 36)
+
+
+def vector_plane_hash(vector: np.ndarray, uniform_plane: np.ndarray) -> str:
+    _validate(vector, uniform_plane)
+    return projection_keys(np.dot(np.asarray(vector)[np.newaxis], uniform_plane))[0]
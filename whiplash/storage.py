@@ -1,11 +1,39 @@
 # -*- coding: utf-8 -*-
 
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Callable, Optional
 
 import boto3  # type: ignore
+from botocore.exceptions import ClientError  # type: ignore
 
 from whiplash.dynamo_util import clean_item
 
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.05
+THROTTLING_ERRORS = ("ProvisionedThroughputExceededException", "ThrottlingException")
+# DynamoDB accepts at most this many items in a single BatchWriteItem request
+MAX_BATCH_WRITE_ITEMS = 25
+# DynamoDB accepts at most this many keys in a single BatchGetItem request
+MAX_BATCH_GET_ITEMS = 100
+
+
+def with_backoff(fn: Callable, *args, **kwargs):
+    """
+    Call a DynamoDB operation, retrying with exponential backoff while throttled.
+    :param fn: The operation to call with the remaining arguments.
+    :return: The result of the operation.
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            return fn(*args, **kwargs)
+        except ClientError as e:
+            throttled = e.response.get("Error", {}).get("Code") in THROTTLING_ERRORS
+            if not throttled or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(BACKOFF_SECONDS * 2**attempt)
+
 
 class DynamoStorage:
     def __init__(self, region_name=None):
@@ -29,6 +57,9 @@ class DynamoTable:
         self.table_name = table_name
         self.table = dynamodb.Table(self.table_name)
         self.dynamodb = dynamodb
+        # Unlike resources, clients are thread safe and can be shared by workers.
+        # The client of a resource converts Python types to DynamoDB types.
+        self.client = dynamodb.meta.client
         self.pk = "id"
 
     def exists(self):
@@ -42,14 +73,17 @@ class DynamoTable:
         except self.dynamodb.meta.client.exceptions.ResourceNotFoundException:
             return False
 
-    def create_table(self):
+    def create_table(self, key_type="S"):
         """
         Create the DynamoDB table.
+        :param key_type: DynamoDB attribute type of the primary key, "S" or "B".
         """
         self.table = self.dynamodb.create_table(
             TableName=self.table_name,
             KeySchema=[{"AttributeName": self.pk, "KeyType": "HASH"}],
-            AttributeDefinitions=[{"AttributeName": self.pk, "AttributeType": "S"}],
+            AttributeDefinitions=[
+                {"AttributeName": self.pk, "AttributeType": key_type}
+            ],
             BillingMode="PAY_PER_REQUEST",
         )
 
@@ -67,10 +101,41 @@ class DynamoTable:
         """
         self.table.put_item(Item=item)
 
-    def put_batch(self, items: list) -> None:
-        with self.table.batch_writer() as batch:
-            for item in items:
-                batch.put_item(Item=item)
+    def put_batch(self, items: list, max_workers: int = 1) -> None:
+        """
+        Store items in the DynamoDB table with concurrent BatchWriteItem requests.
+        Chunk the items into batches of 25 to avoid exceeding the 25-item limit.
+        :param items: A list of dictionaries representing the items to be stored.
+        :param max_workers: The number of batches written concurrently.
+        """
+        batches = [
+            items[i : i + MAX_BATCH_WRITE_ITEMS]
+            for i in range(0, len(items), MAX_BATCH_WRITE_ITEMS)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Consume the results so that failed writes are raised
+            list(executor.map(self.write_batch, batches))
+
+    def write_batch(self, items: list) -> None:
+        """
+        Store up to 25 items with a single BatchWriteItem request.
+        Safe to call from multiple threads.
+        Unprocessed items are resubmitted with exponential backoff.
+        :param items: A list of dictionaries representing the items to be stored.
+        """
+        request_items = {
+            self.table_name: [{"PutRequest": {"Item": item}} for item in items]
+        }
+        for attempt in range(MAX_RETRIES):
+            if attempt:
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+            response = with_backoff(
+                self.client.batch_write_item, RequestItems=request_items
+            )
+            request_items = response.get("UnprocessedItems")
+            if not request_items:
+                return
+        raise RuntimeError(f"Unprocessed items left in {self.table_name} batch write")
 
     def update_column(self, item_id, column_name, new_val):
         """
@@ -90,6 +155,22 @@ class DynamoTable:
             # If the item does not exist, create it
             self.put({self.pk: item_id, column_name: set([new_val])})
 
+    def add_to_set(self, item_id, column_name, values: set) -> None:
+        """
+        Add values to a set column of an item, creating the item if it does not exist.
+        Safe to call from multiple threads.
+        :param item_id: The unique ID of the item to update.
+        :param column_name: The name of the set column to update.
+        :param values: The set of values to add to the column.
+        """
+        with_backoff(
+            self.client.update_item,
+            TableName=self.table_name,
+            Key={self.pk: item_id},
+            UpdateExpression=f"ADD {column_name} :val",
+            ExpressionAttributeValues={":val": values},
+        )
+
     def upsert_items_set_bulk(self, item_ids, column_name, new_val):
         with self.table.batch_writer() as batch:
             # Update the item or create a new item with the primary key and set the new IDs
@@ -112,34 +193,57 @@ class DynamoTable:
             return None
         return clean_item(response.get("Item"))
 
-    def get_batch(self, item_ids: list[str]) -> list[dict]:
+    def get_batch(
+        self, item_ids: list[str], attributes: Optional[list[str]] = None
+    ) -> list[dict]:
         """
         Retrieve multiple items from the DynamoDB table by their IDs.
+        Unprocessed keys are resubmitted with exponential backoff.
+        Safe to call from multiple threads.
         :param item_ids: A list of unique IDs of the items to retrieve.
+        :param attributes: Optional list of attribute names to project, all if None.
         :return: A list of dictionaries representing the retrieved items.
         """
-        response = self.dynamodb.batch_get_item(
-            RequestItems={
-                self.table_name: {
-                    "Keys": [{"id": item_id} for item_id in set(item_ids)],
-                }
-            }
-        )
-        items = response.get("Responses", {}).get(self.table_name, [])
-        return [clean_item(item) for item in items]
+        request = {"Keys": [{"id": item_id} for item_id in set(item_ids)]}
+        if attributes:
+            request["ProjectionExpression"] = ", ".join(f"#{a}" for a in attributes)
+            request["ExpressionAttributeNames"] = {f"#{a}": a for a in attributes}
+
+        request_items = {self.table_name: request}
+        items = []
+        for attempt in range(MAX_RETRIES):
+            if attempt:
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+            response = with_backoff(
+                self.client.batch_get_item, RequestItems=request_items
+            )
+            items.extend(response.get("Responses", {}).get(self.table_name, []))
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                return [clean_item(item) for item in items]
+        raise RuntimeError(f"Unprocessed keys left in {self.table_name} batch get")
 
-    def get_bulk(self, item_ids: list[str]) -> list[dict]:
+    def get_bulk(
+        self,
+        item_ids: list[str],
+        attributes: Optional[list[str]] = None,
+        max_workers: int = 1,
+    ) -> list[dict]:
         """
         Retrieve multiple items from the DynamoDB table by their IDs.
         Chunk the item IDs into batches of 100 to avoid exceeding the 100-item limit.
         :param item_ids: A list of unique IDs of the items to retrieve.
+        :param attributes: Optional list of attribute names to project, all if None.
+        :param max_workers: The number of batches retrieved concurrently.
         :return: A list of dictionaries representing the retrieved items.
         """
-        results = []
-        for i in range(0, len(item_ids), 100):
-            batch = item_ids[i : i + 100]
-            results.extend(self.get_batch(batch))
-        return [clean_item(item) for item in results]
+        batches = [
+            item_ids[i : i + MAX_BATCH_GET_ITEMS]
+            for i in range(0, len(item_ids), MAX_BATCH_GET_ITEMS)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(self.get_batch, batches, repeat(attributes))
+            return [clean_item(item) for batch in results for item in batch]
 
     def delete(self, item_id):
         """
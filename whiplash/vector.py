@@ -1,23 +1,51 @@
 from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
 
 import numpy as np
 
+from whiplash.vector_math import quantize, vector_norm
+
 
 @dataclass
 class Vector:
     id: str
     vector: np.ndarray
+    # L2 norm of the stored vector, when it was persisted with the vector
+    norm: Optional[float] = None
+
+    def __post_init__(self):
+        # Vectors are kept as contiguous float32 from ingress to storage
+        self.vector = np.ascontiguousarray(self.vector, dtype=np.float32)
 
     def to_dict(self):
         return {"id": self.id, "vector": self.vector.tolist()}
 
-    def to_dynamo(self):
-        return {"id": self.id, "vector": self.vector.astype(np.float32).tobytes()}
+    def to_dynamo(self, signature: Optional[bytes] = None):
+        item = {
+            "id": self.id,
+            "vector": self.vector.tobytes(),
+            "norm": Decimal(str(vector_norm(self.vector))),
+        }
+        if signature is not None:
+            item["sig"] = signature
+        return item
+
+    def to_dynamo_i8(self):
+        quantized, scale = quantize(self.vector)
+        return {
+            "id": self.id,
+            "vector_i8": quantized.tobytes(),
+            "scale": Decimal(str(scale)),
+            "norm_i8": Decimal(str(vector_norm(quantized))),
+        }
 
     @staticmethod
     def from_dynamo(item):
         return Vector(
-            item["id"], np.array(np.frombuffer(item["vector"], dtype=np.float32))
+            item["id"],
+            np.array(np.frombuffer(item["vector"], dtype=np.float32)),
+            float(item["norm"]) if "norm" in item else None,
         )
 
 
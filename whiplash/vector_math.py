@@ -1,20 +1,97 @@
 from decimal import Decimal
 
 import numpy as np
-from numpy.linalg import norm
 
+try:
+    import simsimd  # type: ignore
+except ImportError:
+    # Optional SIMD backend, fall back to numpy when it is not installed
+    simsimd = None
 
-def cosine_similarity_bulk(vector1, vectors_list, k=1):
-    distances = norm(np.array(vectors_list) - np.array(vector1), axis=1)
-    closest_indices = np.argsort(distances)[:k]
-    return closest_indices
+
+def vector_norm(vector: np.ndarray) -> float:
+    """Compute the L2 norm of a vector, accumulating integers in float64"""
+    vector = np.asarray(vector, dtype=np.float64)
+    return float(np.sqrt(np.vdot(vector, vector)))
+
+
+def _dot_products(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Compute the dot product between a query and each row of a matrix"""
+    if simsimd is not None:
+        return np.asarray(simsimd.cdist(query[np.newaxis], matrix, metric="dot"))[0]
+    # Accumulate int8 vectors in float32 to avoid overflow and use BLAS
+    return matrix.astype(np.float32, copy=False) @ query.astype(np.float32, copy=False)
+
+
+def _cosine_similarities(
+    query: np.ndarray, matrix: np.ndarray, norms: np.ndarray | None = None
+) -> np.ndarray:
+    """Compute the cosine similarity between a query and each row of a matrix"""
+    if norms is None and simsimd is not None:
+        distances = simsimd.cdist(query[np.newaxis], matrix, metric="cosine")
+        return 1 - np.asarray(distances)[0]
+
+    if norms is None:
+        rows = matrix.astype(np.float32, copy=False)
+        norms = np.sqrt(np.einsum("ij,ij->i", rows, rows))
+    query_norm = np.float32(vector_norm(query))
+    norms = np.asarray(norms, dtype=np.float32)
+    denominators = norms * query_norm
+    # Zero vectors follow the same conventions as cosine_similarity
+    return np.divide(
+        _dot_products(query, matrix),
+        denominators,
+        out=np.where(norms == query_norm, 1.0, 0.0).astype(np.float32),
+        where=denominators != 0,
+    )
+
+
+def cosine_similarity_bulk(
+    vector1, vectors_list, k=1, norms=None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the indices and similarities of the k vectors closest to vector1"""
+    matrix = np.ascontiguousarray(vectors_list)
+    if matrix.dtype != np.int8:
+        matrix = matrix.astype(np.float32, copy=False)
+    query = np.ascontiguousarray(vector1, dtype=matrix.dtype)
+    # Precomputed row norms reduce the scoring to a single matrix-vector product
+    similarities = _cosine_similarities(query, matrix, norms)
+
+    # Partition in O(N) rather than sorting, the k results are left unordered
+    if k >= len(similarities):
+        closest_indices = np.arange(len(similarities))
+    else:
+        closest_indices = np.argpartition(-similarities, k - 1)[:k]
+    return closest_indices, similarities[closest_indices]
+
+
+def quantize(vector: np.ndarray) -> tuple[np.ndarray, float]:
+    """Quantize a vector to int8, returning the quantized vector and its scale"""
+    max_abs = float(np.max(np.abs(vector), initial=0))
+    scale = max_abs / 127 if max_abs > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return quantized, scale
+
+
+def hamming_distance_bulk(signature: bytes, signatures: list[bytes]) -> np.ndarray:
+    """Count the bits that differ between a signature and each of the signatures"""
+    query = np.frombuffer(signature, dtype=np.uint8)
+    matrix = np.frombuffer(b"".join(signatures), dtype=np.uint8).reshape(
+        len(signatures), len(query)
+    )
+    differences = np.bitwise_xor(matrix, query)
+    if hasattr(np, "bitwise_count"):
+        # numpy >= 2.0 exposes a native popcount
+        return np.bitwise_count(differences).sum(axis=1)
+    return np.unpackbits(differences, axis=1).sum(axis=1)
 
 
 def cosine_similarity(vec1, vec2) -> float:
-    norm1 = norm(vec1)
-    norm2 = norm(vec2)
-    if norm1 == 0 and norm2 == 0:
+    # Squared norms via vdot avoid the dispatch overhead of np.linalg.norm
+    square_norm1 = np.vdot(vec1, vec1)
+    square_norm2 = np.vdot(vec2, vec2)
+    if square_norm1 == 0 and square_norm2 == 0:
         return 1
-    if norm1 == 0 or norm2 == 0:
+    if square_norm1 == 0 or square_norm2 == 0:
         return 0
-    return float(np.dot(vec1, vec2) / (norm1 * norm2))
+    return float(np.dot(vec1, vec2) / np.sqrt(square_norm1 * square_norm2))
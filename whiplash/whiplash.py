@@ -82,6 +82,7 @@ class Whiplash:
             n_planes,
             bit_start,
             bit_scale_factor,
+            binary_keys=True,
         )
         collection_config.create_uniform_planes()
 